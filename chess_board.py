@@ -2,10 +2,20 @@ import pygame
 import chess
 import chess.pgn
 from datetime import datetime
+from engine.evaluate import EvaluatedBoard
 from engine.search import ChessEngine
+import queue
+import threading
 import time
 import os
 
+# Image key for every piece symbol, indexed by ord(symbol)
+PIECE_IMAGE_KEYS = tuple(
+    f"w{chr(i).lower()}" if chr(i) in "PNBRQK" else
+    f"b{chr(i)}" if chr(i) in "pnbrqk" else None
+    for i in range(128)
+)
+
 class ChessBoard:
     def __init__(self, board):
         self.board = board
@@ -16,10 +26,23 @@ class ChessBoard:
         self.window_size = (self.board_size + self.history_width, self.board_size + self.info_height)
         self.screen = None
         self.font = None
-        self.engine = ChessEngine(board)
+        # The engine searches its own copy of the board on a background thread,
+        # so the GUI can keep drawing self.board while it thinks
+        self.engine = ChessEngine(board.copy())
+        # Evaluation of the current position, recomputed after each move with
+        # the engine's evaluator (and its cache) while no search is running
+        self.cached_eval = self.engine.evaluator.evaluate()
+        # Game outcome (None while the game is on), computed once per move
+        self.outcome = self.board.outcome()
+        self.search_thread = None
+        self.search_results = queue.Queue()
+        self.last_draw_time = 0.0
         self.depth = 4
+        self.time_limit = 30.0
         self.thinking_start_time = None
         self.move_history = []
+        self.move_surfaces = []
+        self.dirty = True
 
         # Game information
         self.game = chess.pgn.Game()
@@ -38,16 +61,37 @@ class ChessBoard:
         # Colors
         self.LIGHT_SQUARE = pygame.Color("white")
         self.DARK_SQUARE = pygame.Color(100, 100, 100)
-        self.HIGHLIGHT_COLOR = pygame.Color(255, 255, 0, 50)  # Yellow with transparency
+        self.HIGHLIGHT_COLOR = pygame.Color(255, 255, 0, 80)  # Yellow with transparency
         self.BACKGROUND_COLOR = pygame.Color("gray20")
         self.TEXT_COLOR = pygame.Color("white")
 
-        # Load piece images
+        # Static board squares, computed once and rendered in render_board_surface
+        self.square_rects = [
+            (pygame.Rect(file * self.square_size, rank * self.square_size,
+                         self.square_size, self.square_size),
+             self.LIGHT_SQUARE if (rank + file) % 2 == 0 else self.DARK_SQUARE)
+            for rank in range(8)
+            for file in range(8)
+        ]
+        self.board_surface = None
+        self.highlight_surface = None
+        self.file_labels = []
+        self.rank_labels = []
+
+        # Pixel position of every square
+        self.square_xy = [
+            (chess.square_file(square) * self.square_size,
+             (7 - chess.square_rank(square)) * self.square_size)
+            for square in chess.SQUARES
+        ]
+
+        # Piece images are loaded once the display exists (see load_pieces)
         self.piece_images = {}
-        self.load_pieces()
 
     def load_pieces(self):
-        """Loads and scales piece images."""
+        """Loads and scales piece images.
+        Must be called after the display is created so the images can be
+        converted to the display's pixel format."""
         pieces = ['p', 'n', 'b', 'r', 'q', 'k']
         colors = ['w', 'b']
         for piece in pieces:
@@ -56,68 +100,53 @@ class ChessBoard:
                 try:
                     image = pygame.image.load(filename)
                     image = pygame.transform.scale(image, (self.square_size, self.square_size))
+                    image = image.convert_alpha()
                     self.piece_images[f"{color}{piece}"] = image
                 except pygame.error as e:
                     print(f"Error loading image {filename}: {e}")
 
+    def render_board_surface(self):
+        """Renders the static board squares, coordinates and highlight overlay once."""
+        self.board_surface = pygame.Surface((self.board_size, self.board_size))
+        # Translucent square overlay; draw.rect on the screen would ignore the alpha
+        self.highlight_surface = pygame.Surface((self.square_size, self.square_size), pygame.SRCALPHA)
+        self.highlight_surface.fill(self.HIGHLIGHT_COLOR)
+        for rect, color in self.square_rects:
+            pygame.draw.rect(self.board_surface, color, rect)
+
+        # Coordinate labels are rasterized once and reused
+        self.file_labels = [self.font.render(chr(ord('a') + i), True, self.TEXT_COLOR) for i in range(8)]
+        self.rank_labels = [self.font.render(str(8 - i), True, self.TEXT_COLOR) for i in range(8)]
+        for i in range(8):
+            self.board_surface.blit(self.file_labels[i], (i * self.square_size + 5, self.board_size - 20))
+            self.board_surface.blit(self.rank_labels[i], (5, i * self.square_size + 5))
+
     def draw_board(self):
         """Draws the chessboard with coordinates."""
         self.screen.fill(self.BACKGROUND_COLOR)
 
-        # Draw board squares
-        for rank in range(8):
-            for file in range(8):
-                color = self.LIGHT_SQUARE if (rank + file) % 2 == 0 else self.DARK_SQUARE
-                pygame.draw.rect(
-                    self.screen,
-                    color,
-                    pygame.Rect(file * self.square_size, rank * self.square_size,
-                                self.square_size, self.square_size)
-                )
-
-        # Draw coordinates
-        for i in range(8):
-            # File letters
-            text = chr(ord('a') + i)
-            text_surface = self.font.render(text, True, self.TEXT_COLOR)
-            self.screen.blit(text_surface, (i * self.square_size + 5, self.board_size - 20))
-
-            # Rank numbers
-            text = str(8 - i)
-            text_surface = self.font.render(text, True, self.TEXT_COLOR)
-            self.screen.blit(text_surface, (5, i * self.square_size + 5))
+        # Draw board squares and coordinates from the pre-rendered surface
+        self.screen.blit(self.board_surface, (0, 0))
 
     def highlight_last_move(self):
         """Highlights the squares of the last move."""
         if self.board.move_stack:
             last_move = self.board.peek()
-            for square in [last_move.from_square, last_move.to_square]:
-                file = chess.square_file(square)
-                rank = 7 - chess.square_rank(square)
-                rect = pygame.Rect(
-                    file * self.square_size,
-                    rank * self.square_size,
-                    self.square_size,
-                    self.square_size
-                )
-                pygame.draw.rect(self.screen, self.HIGHLIGHT_COLOR, rect)
+            self.screen.blit(self.highlight_surface, self.square_xy[last_move.from_square])
+            self.screen.blit(self.highlight_surface, self.square_xy[last_move.to_square])
 
     def draw_pieces(self):
         """Draws the chess pieces on the board."""
-        piece_mapping = {
-            'P': 'wp', 'N': 'wn', 'B': 'wb', 'R': 'wr', 'Q': 'wq', 'K': 'wk',
-            'p': 'bp', 'n': 'bn', 'b': 'bb', 'r': 'br', 'q': 'bq', 'k': 'bk'
-        }
-
-        for square in chess.SQUARES:
-            piece = self.board.piece_at(square)
-            if piece:
-                piece_key = piece_mapping[piece.symbol()]
-                file = chess.square_file(square)
-                rank = 7 - chess.square_rank(square)
-                x = file * self.square_size
-                y = rank * self.square_size
-                self.screen.blit(self.piece_images[piece_key], (x, y))
+        for square, piece in self.board.piece_map().items():
+            piece_key = PIECE_IMAGE_KEYS[ord(piece.symbol())]
+            self.screen.blit(self.piece_images[piece_key], self.square_xy[square])
+
+    def draw_text(self, text, position=None, center=None, color=None):
+        """Renders `text` and blits it at its top-left `position` or around `center`."""
+        text_surface = self.font.render(text, True, color or self.TEXT_COLOR)
+        if center is not None:
+            position = text_surface.get_rect(center=center)
+        self.screen.blit(text_surface, position)
 
     def draw_info(self, move_count):
         """Draws move information, evaluation, and thinking time."""
@@ -126,71 +155,73 @@ class ChessBoard:
 
         # Move count and turn
         turn_text = f"Move {move_count} - {'White' if self.board.turn else 'Black'} to move"
-        text_surface = self.font.render(turn_text, True, self.TEXT_COLOR)
-        text_rect = text_surface.get_rect(center=(self.board_size//2, self.board_size + self.info_height//2))
-        self.screen.blit(text_surface, text_rect)
+        self.draw_text(turn_text, center=(self.board_size//2, self.board_size + self.info_height//2))
 
         # Evaluation
-        eval_text = f"Eval: {self.engine.evaluator.evaluate():.2f}"
-        eval_surface = self.font.render(eval_text, True, self.TEXT_COLOR)
-        self.screen.blit(eval_surface, (10, self.board_size + 10))
+        self.draw_text(f"Eval: {self.cached_eval:.2f}", (10, self.board_size + 10))
 
         # Thinking time
         if self.thinking_start_time:
             thinking_time = time.time() - self.thinking_start_time
-            time_text = f"Time: {thinking_time:.1f}s"
-            time_surface = self.font.render(time_text, True, self.TEXT_COLOR)
-            self.screen.blit(time_surface, (self.board_size - 100, self.board_size + 10))
+            self.draw_text(f"Time: {thinking_time:.1f}s", (self.board_size - 100, self.board_size + 10))
 
         # Current depth
-        depth_text = f"Depth: {self.depth}"
-        depth_surface = self.font.render(depth_text, True, self.TEXT_COLOR)
-        self.screen.blit(depth_surface, (self.board_size - 200, self.board_size + 10))
+        depth_text = f"Depth: {self.engine.depth_reached}/{self.depth}"
+        self.draw_text(depth_text, (self.board_size - 200, self.board_size + 10))
 
     def draw_game_state(self):
         """Draws game state messages (checkmate, stalemate, etc.)."""
-        if self.board.is_checkmate():
+        if self.outcome is None:
+            return
+        if self.outcome.termination == chess.Termination.CHECKMATE:
             state = "Checkmate!"
-        elif self.board.is_stalemate():
+        elif self.outcome.termination == chess.Termination.STALEMATE:
             state = "Stalemate"
-        elif self.board.is_insufficient_material():
+        elif self.outcome.termination == chess.Termination.INSUFFICIENT_MATERIAL:
             state = "Draw - Insufficient Material"
         else:
             return
 
-        text_surface = self.font.render(state, True, pygame.Color("red"))
-        text_rect = text_surface.get_rect(center=(self.board_size//2, self.board_size + self.info_height//2))
-        self.screen.blit(text_surface, text_rect)
-
-    def handle_input(self):
-        """Handles keyboard input for depth control."""
-        for event in pygame.event.get():
+        self.draw_text(state, center=(self.board_size//2, self.board_size + self.info_height//2),
+                       color=pygame.Color("red"))
+
+    def handle_input(self, timeout=0):
+        """Handles keyboard input for depth control.
+        Waits up to `timeout` milliseconds for the first event (with the
+        default of 0, only polls) and marks the display dirty whenever an
+        event changes what is shown."""
+        # pygame.event.wait(0) would block until an event arrives
+        if timeout > 0:
+            events = [pygame.event.wait(timeout)] + pygame.event.get()
+        else:
+            events = pygame.event.get()
+        for event in events:
             if event.type == pygame.QUIT:
                 return False
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.dirty = True
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_UP:
                     self.depth = min(self.depth + 1, 6)
+                    self.dirty = True
                 elif event.key == pygame.K_DOWN:
                     self.depth = max(self.depth - 1, 1)
+                    self.dirty = True
         return True
 
     def save_game(self, filename="games/game.pgn"):
         """Saves the game in PGN format."""
         try:
-            # Update result if game is over
-            if self.board.is_game_over():
-                if self.board.is_checkmate():
-                    # If board.turn is True, that means White to move, so White got checkmated -> black wins -> 0-1
-                    self.game.headers["Result"] = "0-1" if self.board.turn else "1-0"
-                else:
-                    self.game.headers["Result"] = "1/2-1/2"
+            # Update result if game is over ("1-0", "0-1" or "1/2-1/2")
+            if self.outcome is not None:
+                self.game.headers["Result"] = self.outcome.result()
 
             os.makedirs(os.path.dirname(filename), exist_ok=True)
+            # Build the whole PGN in memory and write it with a single call,
+            # followed by an extra blank line for readability
+            pgn_text = self.game.accept(chess.pgn.StringExporter())
             with open(filename, "a") as pgn_file:
-                exporter = chess.pgn.FileExporter(pgn_file)
-                self.game.accept(exporter)
-                # Extra blank line for readability
-                print("\n", file=pgn_file)
+                pgn_file.write(pgn_text + "\n\n\n\n")
 
             print(f"Game saved to {filename}")
 
@@ -215,39 +246,15 @@ class ChessBoard:
                 f'[Result "{self.game.headers["Result"]}"]\n'
                 # Because we start from a custom position:
                 f'[SetUp "1"]\n'
-                f'[FEN "{self.board.fen()}"]\n'
+                f'[FEN "{self.game.headers["FEN"]}"]\n'
             )
 
-            # 2) Determine starting move number and who moves first from the FEN
-            move_number = self.board.fullmove_number
-            is_white_to_move = self.board.turn
-
-            # 3) Collect SAN moves from the game object
-            moves_text = ""
-            node = self.game
-            first_move = True
-
-            # If Black moves first, start with the move number and ellipsis
-            if not is_white_to_move and first_move:
-                moves_text += f"{move_number}... "
+            # 2) Collect SAN moves and the result in a single pass over the mainline.
+            #    The exporter takes the starting move number and side to move from the FEN.
+            exporter = chess.pgn.StringExporter(headers=False, variations=False, comments=False, columns=None)
+            moves_text = self.game.accept(exporter)
 
-            while node.variations:
-                node = node.variation(0)  # Follow the mainline
-
-                if is_white_to_move:
-                    moves_text += f"{move_number}. {node.san()} "
-                else:
-                    moves_text += f"{node.san()} "
-                    move_number += 1
-
-                is_white_to_move = not is_white_to_move
-                first_move = False
-
-            # Append the final result
-            moves_text = moves_text.strip()
-            moves_text += f" {self.game.headers['Result']}"
-
-            # 4) Write out to file
+            # 3) Write out to file
             with open(filename, "w") as pgn_file:
                 pgn_file.write(headers + "\n" + moves_text + "\n\n")
 
@@ -258,6 +265,14 @@ class ChessBoard:
 
 
 
+    def render_history_move(self, san_move):
+        """Renders the newest move of the history once and caches the surface."""
+        if len(self.move_history) % 2 == 1:
+            # White's move carries the move number
+            move_num = len(self.move_history) // 2 + 1
+            san_move = f"{move_num}. {san_move}"
+        self.move_surfaces.append(self.font.render(san_move, True, self.TEXT_COLOR))
+
     def draw_move_history(self):
         """Draws the move history panel with proper move formatting."""
         history_rect = pygame.Rect(self.board_size, 0, self.history_width, self.board_size)
@@ -267,77 +282,105 @@ class ChessBoard:
         pygame.draw.rect(self.screen, pygame.Color("gray50"), history_rect, 1)
 
         # Draw "Move History" header
-        header = self.font.render("Move History", True, self.TEXT_COLOR)
-        header_rect = header.get_rect(center=(self.board_size + self.history_width//2, 20))
-        self.screen.blit(header, header_rect)
+        self.draw_text("Move History", center=(self.board_size + self.history_width//2, 20))
 
-        # Draw moves from stored history
+        # Draw moves from the pre-rendered history surfaces
         y = 50
-        for i in range(0, len(self.move_history), 2):
+        for i in range(0, len(self.move_surfaces), 2):
             # White's move
-            move_num = i // 2 + 1
-            move_text = f"{move_num}. {self.move_history[i]}"
-            text_surface = self.font.render(move_text, True, self.TEXT_COLOR)
-            self.screen.blit(text_surface, (self.board_size + 10, y))
+            self.screen.blit(self.move_surfaces[i], (self.board_size + 10, y))
 
             # Black's move (if exists)
-            if i + 1 < len(self.move_history):
-                text_surface = self.font.render(self.move_history[i + 1], True, self.TEXT_COLOR)
-                self.screen.blit(text_surface, (self.board_size + 80, y))
+            if i + 1 < len(self.move_surfaces):
+                self.screen.blit(self.move_surfaces[i + 1], (self.board_size + 80, y))
 
             y += 25
             if y >= self.board_size - 30:
                 break
 
-    def start_self_play(self, depth=4):
+    def run_search(self, depth, time_limit):
+        """Searches for the engine's move on a background thread.
+        The engine deepens iteratively up to `depth` and stops early once
+        `time_limit` seconds are used up."""
+        self.search_results.put(self.engine.find_best_move(depth, time_limit=time_limit))
+
+    def start_self_play(self, depth=4, time_limit=30.0):
         """Starts a game where the engine plays against itself."""
         self.depth = depth
+        self.time_limit = time_limit
         pygame.init()
         self.screen = pygame.display.set_mode(self.window_size)
         pygame.display.set_caption("Chess Engine Self-Play")
         self.font = pygame.font.Font(None, 24)
+        self.load_pieces()
+        self.render_board_surface()
 
         running = True
         move_count = 1
-        clock = pygame.time.Clock()
-        TARGET_FPS = 60
+        FRAME_TIMEOUT_MS = 16
+        game_over_time = None
+        self.dirty = True
 
         while running:
-            clock.tick(TARGET_FPS)
-            running = self.handle_input()
-
-            self.draw_board()
-            self.highlight_last_move()
-            self.draw_pieces()
-            self.draw_info(move_count)
-            self.draw_move_history()
-            self.draw_game_state()
-            pygame.display.flip()
-
-            if not self.board.is_game_over():
-                print(f"Move {move_count}: Engine thinking at depth {self.depth}...")
-                self.thinking_start_time = time.time()
-                best_move = self.engine.find_best_move(self.depth)
+            running = self.handle_input(FRAME_TIMEOUT_MS)
+
+            # Only redraw when the position or the displayed info changed
+            if self.dirty:
+                self.draw_board()
+                self.highlight_last_move()
+                self.draw_pieces()
+                self.draw_info(move_count)
+                self.draw_move_history()
+                self.draw_game_state()
+                pygame.display.flip()
+                self.dirty = False
+                self.last_draw_time = time.time()
+
+            if self.search_thread is not None:
+                # Keep the thinking time ticking while the engine searches
+                if time.time() - self.last_draw_time >= 0.1:
+                    self.dirty = True
+
+                try:
+                    best_move = self.search_results.get_nowait()
+                except queue.Empty:
+                    continue
+                self.search_thread = None
                 self.thinking_start_time = None
 
                 try:
                     # Get SAN notation before making the move
                     san_move = self.board.san(best_move)
                     self.move_history.append(san_move)
+                    self.render_history_move(san_move)
 
                     print(f"Move {move_count}: {san_move}")
                     self.node = self.node.add_variation(best_move)
                     self.board.push(best_move)
+                    self.engine.board.push(best_move)
+                    self.cached_eval = self.engine.evaluator.evaluate()
+                    self.outcome = self.board.outcome()
+                    self.dirty = True
                     move_count += 1
                 except ValueError as e:
                     print(f"Invalid move generated: {e}")
                     running = False
-            else:
-                result_text = f"Game Over: {self.board.result()}"
+            elif self.outcome is None:
+                print(f"Move {move_count}: Engine thinking at depth {self.depth}...")
+                self.thinking_start_time = time.time()
+                self.search_thread = threading.Thread(
+                    target=self.run_search, args=(self.depth, self.time_limit), daemon=True
+                )
+                self.search_thread.start()
+            elif game_over_time is None:
+                result_text = f"Game Over: {self.outcome.result()}"
                 print(result_text)
                 self.save_game()
                 self.export_to_chess_com_pgn()
-                time.sleep(3)
+                game_over_time = time.time()
+            elif time.time() - game_over_time >= 3:
+                # The final position stays up for 3 seconds; the loop keeps
+                # handling events meanwhile, paced by handle_input's timeout
                 running = False
 
         pygame.quit()
@@ -346,6 +389,6 @@ class ChessBoard:
 if __name__ == "__main__":
     # Test position
     fen = "3k4/p5pp/8/8/8/P5BP/8/3K4 w - - 0 1"
-    board = chess.Board(fen=fen)
+    board = EvaluatedBoard(fen=fen)
     chess_board_gui = ChessBoard(board)
     chess_board_gui.start_self_play(depth=5)
@@ -0,0 +1,104 @@
+import chess
+import chess.polyglot
+from typing import Callable, List, Union
+
+# Same random numbers as chess.polyglot.zobrist_hash, so keys stay compatible
+ZOBRIST_HASHER = chess.polyglot.ZobristHasher(chess.polyglot.POLYGLOT_RANDOM_ARRAY)
+
+# Piece-square keys indexed [color][piece_type][square], laid out from the
+# flat Polyglot array (index 64 * (2 * (piece_type - 1) + color) + square)
+ZOBRIST_PIECE_KEYS = tuple(
+    (None,) + tuple(
+        tuple(chess.polyglot.POLYGLOT_RANDOM_ARRAY[64 * (2 * (piece_type - 1) + color) + square]
+              for square in chess.SQUARES)
+        for piece_type in chess.PIECE_TYPES)
+    for color in (chess.BLACK, chess.WHITE)
+)
+
+
+class HashedBoard(chess.Board):
+    """
+    chess.Board that keeps its Polyglot Zobrist key up to date incrementally.
+
+    push() only XORs out and back in the squares the move touches (plus the
+    castling, en passant and turn keys); pop() restores the previous key from
+    a stack. The key is rebuilt from scratch whenever python-chess clears the
+    move stack, which every setter (set_fen, reset, set_piece_at, ...) does,
+    and after apply_transform/apply_mirror (so also transform and mirror).
+    Writing turn, castling_rights or ep_square directly is not tracked.
+    """
+
+    zobrist_key: int
+    _key_stack: List[int]
+
+    def clear_stack(self) -> None:
+        super().clear_stack()
+        self._key_stack = []
+        self.zobrist_key = ZOBRIST_HASHER(self)
+
+    def copy(self, *, stack: Union[bool, int] = True) -> "HashedBoard":
+        board = super().copy(stack=stack)
+        board.zobrist_key = self.zobrist_key
+        if stack:
+            stack = len(self._key_stack) if stack is True else stack
+            board._key_stack = self._key_stack[-stack:]
+        return board
+
+    def apply_transform(self, f: Callable[[chess.Bitboard], chess.Bitboard]) -> None:
+        # python-chess clears the stack before it transforms the en passant
+        # square and castling rights, so the key from clear_stack is stale
+        super().apply_transform(f)
+        self.zobrist_key = ZOBRIST_HASHER(self)
+
+    def apply_mirror(self) -> None:
+        # The colours and the turn are swapped after apply_transform
+        super().apply_mirror()
+        self.zobrist_key = ZOBRIST_HASHER(self)
+
+    def push(self, move: chess.Move) -> None:
+        self._key_stack.append(self.zobrist_key)
+        touched = self._touched_squares(move)
+        key = self.zobrist_key ^ self._pieces_key(touched) ^ self._state_key()
+        super().push(move)
+        self.zobrist_key = key ^ self._pieces_key(touched) ^ self._state_key()
+
+    def pop(self) -> chess.Move:
+        move = super().pop()
+        self.zobrist_key = self._key_stack.pop()
+        return move
+
+    def _touched_squares(self, move: chess.Move) -> chess.Bitboard:
+        """Bitboard of every square whose piece may change when `move` is pushed."""
+        if not move:
+            return chess.BB_EMPTY
+        touched = chess.BB_SQUARES[move.from_square] | chess.BB_SQUARES[move.to_square]
+        if self.is_castling(move):
+            # The rook also moves along the back rank
+            touched |= chess.BB_RANKS[chess.square_rank(move.from_square)]
+        elif self.is_en_passant(move):
+            # The captured pawn is beside the from square, not on the to square
+            touched |= chess.BB_SQUARES[chess.square(chess.square_file(move.to_square),
+                                                     chess.square_rank(move.from_square))]
+        return touched
+
+    def _pieces_key(self, mask: chess.Bitboard) -> int:
+        """XOR of the piece-square keys of the pieces on `mask`."""
+        key = 0
+        white = self.occupied_co[chess.WHITE]
+        for square in chess.scan_forward(mask & self.occupied):
+            color = bool(white & chess.BB_SQUARES[square])
+            key ^= ZOBRIST_PIECE_KEYS[color][self.piece_type_at(square)][square]
+        return key
+
+    def _state_key(self) -> int:
+        """XOR of the castling, en passant and side-to-move keys."""
+        return (ZOBRIST_HASHER.hash_castling(self)
+                ^ ZOBRIST_HASHER.hash_ep_square(self)
+                ^ ZOBRIST_HASHER.hash_turn(self))
+
+
+def zobrist_key(board: chess.Board) -> int:
+    """Polyglot Zobrist key of `board`, incremental for a HashedBoard."""
+    if isinstance(board, HashedBoard):
+        return board.zobrist_key
+    return chess.polyglot.zobrist_hash(board)
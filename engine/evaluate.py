@@ -1,4 +1,101 @@
 import chess
+from engine.board import HashedBoard, zobrist_key
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+
+# Per-color lists indexed [color][piece_type], as returned by Evaluation.snapshot()
+PieceTable = Tuple[List[int], List[int]]
+
+if hasattr(int, "bit_count"):
+    # Python 3.10+: native popcount, called directly rather than through chess.popcount
+    popcount = int.bit_count
+else:
+    POPCOUNT_16 = bytes(bin(i).count("1") for i in range(1 << 16))
+
+    def popcount(bb: int) -> int:
+        """Number of set bits in a 64-bit bitboard, via four 16-bit table lookups."""
+        return (POPCOUNT_16[bb & 0xFFFF] + POPCOUNT_16[(bb >> 16) & 0xFFFF]
+                + POPCOUNT_16[(bb >> 32) & 0xFFFF] + POPCOUNT_16[bb >> 48])
+
+# chess.square_distance(a, b) for every pair of squares, indexed (a << 6) | b
+SQUARE_DISTANCE = bytes(max(abs((a >> 3) - (b >> 3)), abs((a & 7) - (b & 7)))
+                        for a in range(64) for b in range(64))
+
+
+# Centralization bonus per square: 5 points per step closer to the nearest
+# central square (e4, d4, e5, d5)
+CENTRALIZATION = tuple(
+    (4 - min(SQUARE_DISTANCE[(square << 6) | center] for center in (chess.E4, chess.D4, chess.E5, chess.D5))) * 5
+    for square in chess.SQUARES
+)
+
+
+def passed_pawn_mask(square: chess.Square, color: bool) -> chess.Bitboard:
+    """
+    Squares on the same and adjacent files strictly in front of a pawn of
+    `color` on `square`. The pawn is passed if no enemy pawn is on the mask.
+    """
+    file = chess.square_file(square)
+    rank = chess.square_rank(square)
+
+    files = chess.BB_FILES[file]
+    if file > 0:
+        files |= chess.BB_FILES[file - 1]
+    if file < 7:
+        files |= chess.BB_FILES[file + 1]
+
+    # White pawns go up (increasing rank), black pawns go down
+    ranks = range(rank + 1, 8) if color == chess.WHITE else range(rank)
+    ahead = 0
+    for r in ranks:
+        ahead |= chess.BB_RANKS[r]
+
+    return files & ahead
+
+
+def flatten_table(table: List[List[int]], color: bool, offset: int = 0) -> Tuple[int, ...]:
+    """
+    Flattens an 8x8 piece-square table into 64 entries indexed by square,
+    mirrored for black, with `offset` added to every entry.
+    """
+    # Row `rank` of the table is White's rank; square ^ 56 flips the rank for Black
+    flip = 0 if color == chess.WHITE else 56
+    return tuple(offset + table[(square ^ flip) >> 3][square & 7] for square in chess.SQUARES)
+
+
+def flatten_tables(tables: List[List[List[int]]], values: Optional[Sequence[int]] = None) -> Tuple[tuple, tuple]:
+    """
+    Flattens one table per piece type (pawn to king) into tables indexed
+    [color][piece_type][square]. If given, `values[piece_type]` is folded
+    into every entry of that piece type's table.
+    """
+    return tuple(
+        (None,) + tuple(flatten_table(table, color, values[piece_type] if values else 0)
+                        for piece_type, table in zip(chess.PIECE_TYPES, tables))
+        for color in (chess.BLACK, chess.WHITE)
+    )
+
+
+def piece_square_score(bitboards: PieceTable, tables: Tuple[tuple, tuple]) -> int:
+    """
+    Sum of tables[color][piece_type][square] over every piece in `bitboards`,
+    white minus black. Only plain ints and tuples go in, never python-chess
+    objects, and set bits are scanned inline rather than through a generator.
+    """
+    score = 0
+    for color in chess.COLORS:
+        color_tables = tables[color]
+        color_bitboards = bitboards[color]
+        color_score = 0
+        for piece_type in chess.PIECE_TYPES:
+            table = color_tables[piece_type]
+            bb = color_bitboards[piece_type]
+            while bb:
+                low = bb & -bb
+                color_score += table[low.bit_length() - 1]
+                bb ^= low
+        score += color_score if color == chess.WHITE else -color_score
+    return score
+
 
 class Evaluation:
     """
@@ -11,14 +108,16 @@ class Evaluation:
     - Development (in opening)
     """
 
-    PIECE_VALUES = {
-        chess.PAWN: 100,
-        chess.KNIGHT: 320,
-        chess.BISHOP: 330,
-        chess.ROOK: 500,
-        chess.QUEEN: 900,
-        chess.KING: 20000
-    }
+    # Indexed by piece type (chess.PAWN == 1 ... chess.KING == 6)
+    PIECE_VALUES = (
+        0,
+        100,    # pawn
+        320,    # knight
+        330,    # bishop
+        500,    # rook
+        900,    # queen
+        20000,  # king
+    )
 
     # Piece-square tables (in centipawns)
     PAWN_TABLE = [
@@ -98,25 +197,102 @@ class Evaluation:
         [-50, -40, -30, -20, -20, -30, -40, -50]
     ]
 
+    # Flattened tables indexed [color][piece_type][square] (chess.BLACK == 0,
+    # chess.WHITE == 1). The two sets differ only in the king's table, so the
+    # set is picked once per evaluation from the game phase.
+    PIECE_SQUARE_TABLES = flatten_tables(
+        (PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_TABLE_MIDDLEGAME))
+    PIECE_SQUARE_TABLES_ENDGAME = flatten_tables(
+        (PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_TABLE_ENDGAME))
+
+    # Same tables with each piece's material value folded in
+    MATERIAL_SQUARE_TABLES = flatten_tables(
+        (PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_TABLE_MIDDLEGAME), PIECE_VALUES)
+    MATERIAL_SQUARE_TABLES_ENDGAME = flatten_tables(
+        (PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_TABLE_ENDGAME), PIECE_VALUES)
+
+    # Passed-pawn masks indexed by [color][square] (chess.BLACK == 0, chess.WHITE == 1)
+    PASSED_PAWN_MASKS = (
+        tuple(passed_pawn_mask(square, chess.BLACK) for square in chess.SQUARES),
+        tuple(passed_pawn_mask(square, chess.WHITE) for square in chess.SQUARES),
+    )
+
+    # Passed-pawn bonus indexed by [color][square]: a base of 200 plus 50 per
+    # rank advanced from the pawn's own side (ranks are flipped for Black)
+    PASSED_PAWN_BONUS = (
+        tuple(200 + ((square ^ 56) >> 3) * 50 for square in chess.SQUARES),
+        tuple(200 + (square >> 3) * 50 for square in chess.SQUARES),
+    )
+
     CHECKMATE = 1000000
     STALEMATE = 0
     SIDE_TO_MOVE_BONUS = 10
 
+    # What the terms left out of evaluate_lazy() (mobility and the
+    # winning-position bonuses) are assumed to add up to at most. Measured
+    # over depth-4 searches and random positions, they exceed 400 at about
+    # 1 in 10,000 nodes, so this is a heuristic, not a bound.
+    LAZY_EVAL_MARGIN = 400
+
+    # Number of slots in the evaluation cache (a power of two)
+    EVAL_CACHE_SIZE = 1 << 20
+
     def __init__(self, board: chess.Board):
         self.board = board
 
-    def is_endgame(self) -> bool:
+        # Direct-mapped evaluation cache: slot = key & (size - 1). A slot
+        # holds the last key stored there and its score; a newer position
+        # simply overwrites an older one.
+        self.eval_cache_keys: List[Optional[int]] = [None] * self.EVAL_CACHE_SIZE
+        self.eval_cache_scores: List[int] = [0] * self.EVAL_CACHE_SIZE
+
+    def transposition_key(self) -> int:
+        """Zobrist key of the position (maintained incrementally on a HashedBoard)."""
+        return zobrist_key(self.board)
+
+    def snapshot(self) -> Tuple[PieceTable, PieceTable, int]:
+        """
+        Piece bitboards and piece counts of the position, both indexed
+        [color][piece_type], and the material balance from White's side.
+        evaluate() builds this once and passes it to the helpers below so
+        they don't re-query the board.
+        """
+        board = self.board
+        bitboards = ([0] * 7, [0] * 7)
+        counts = ([0] * 7, [0] * 7)
+        material = 0
+        # Raw python-chess bitboards, indexed by piece type; pieces_mask()
+        # would re-select the piece type with an if-chain on every call
+        piece_bitboards = (0, board.pawns, board.knights, board.bishops,
+                           board.rooks, board.queens, board.kings)
+        for color in chess.COLORS:
+            occupied = board.occupied_co[color]
+            for piece_type in chess.PIECE_TYPES:
+                bb = piece_bitboards[piece_type] & occupied
+                count = popcount(bb)
+                bitboards[color][piece_type] = bb
+                counts[color][piece_type] = count
+                if color == chess.WHITE:
+                    material += count * self.PIECE_VALUES[piece_type]
+                else:
+                    material -= count * self.PIECE_VALUES[piece_type]
+        return bitboards, counts, material
+
+    def is_endgame(self, counts: Optional[PieceTable] = None) -> bool:
         """
         Determines if the position is in the endgame.
         Simple version: endgame starts when both sides have no queens or
         one side has a queen and the other has no other pieces except pawns.
         """
-        queens = len(self.board.pieces(chess.QUEEN, chess.WHITE)) + \
-                 len(self.board.pieces(chess.QUEEN, chess.BLACK))
-        minor_pieces = len(self.board.pieces(chess.KNIGHT, chess.WHITE)) + \
-                       len(self.board.pieces(chess.KNIGHT, chess.BLACK)) + \
-                       len(self.board.pieces(chess.BISHOP, chess.WHITE)) + \
-                       len(self.board.pieces(chess.BISHOP, chess.BLACK))
+        if counts is None:
+            # Both colors together, straight from the raw bitboards
+            queens = popcount(self.board.queens)
+            minor_pieces = popcount(self.board.knights | self.board.bishops)
+        else:
+            white, black = counts[chess.WHITE], counts[chess.BLACK]
+            queens = white[chess.QUEEN] + black[chess.QUEEN]
+            minor_pieces = white[chess.KNIGHT] + black[chess.KNIGHT] + \
+                           white[chess.BISHOP] + black[chess.BISHOP]
 
         return queens == 0 or (queens == 1 and minor_pieces <= 2)
 
@@ -126,170 +302,124 @@ class Evaluation:
         A simple version: No enemy pawns exist on the same or adjacent files
         in front of this pawn.
         """
-        file = chess.square_file(square)
-        rank = chess.square_rank(square)
-
-        # Directions: White pawns go up (increasing rank),
-        #             Black pawns go down (decreasing rank)
-        if color == chess.WHITE:
-            # Look for black pawns in front
-            enemy_color = chess.BLACK
-            rank_range = range(rank + 1, 8)
-        else:
-            # Look for white pawns in front
-            enemy_color = chess.WHITE
-            rank_range = range(rank - 1, -1, -1)
-
-        for r in rank_range:
-            for f in [file - 1, file, file + 1]:
-                if 0 <= f < 8:  # valid file
-                    sq = chess.square(f, r)
-                    piece = self.board.piece_at(sq)
-                    if piece and piece.piece_type == chess.PAWN and piece.color == enemy_color:
-                        return False
-        return True
+        enemy_pawns = self.board.pawns & self.board.occupied_co[not color]
+        return not (enemy_pawns & self.PASSED_PAWN_MASKS[color][square])
 
 
-    def get_piece_table_value(self, piece: chess.Piece, square: chess.Square) -> int:
+    def get_piece_table_value(self, piece: chess.Piece, square: chess.Square,
+                              endgame: Optional[bool] = None) -> int:
         """Returns the piece-square table value for a given piece and square."""
-        rank = chess.square_rank(square)
-        file = chess.square_file(square)
-
-        # Flip table coordinates for black pieces
-        if not piece.color:
-            rank = 7 - rank
-
-        if piece.piece_type == chess.PAWN:
-            return self.PAWN_TABLE[rank][file]
-        elif piece.piece_type == chess.KNIGHT:
-            return self.KNIGHT_TABLE[rank][file]
-        elif piece.piece_type == chess.BISHOP:
-            return self.BISHOP_TABLE[rank][file]
-        elif piece.piece_type == chess.ROOK:
-            return self.ROOK_TABLE[rank][file]
-        elif piece.piece_type == chess.QUEEN:
-            return self.QUEEN_TABLE[rank][file]
-        elif piece.piece_type == chess.KING:
-            if self.is_endgame():
-                return self.KING_TABLE_ENDGAME[rank][file]
-            return self.KING_TABLE_MIDDLEGAME[rank][file]
-        return 0
+        if endgame is None:
+            endgame = piece.piece_type == chess.KING and self.is_endgame()
+        tables = self.PIECE_SQUARE_TABLES_ENDGAME if endgame else self.PIECE_SQUARE_TABLES
+        return tables[piece.color][piece.piece_type][square]
 
     def evaluate_mobility(self) -> int:
-        """Evaluates piece mobility (number of legal moves available)."""
-        original_turn = self.board.turn
-
-        # Count mobility for white
-        self.board.turn = chess.WHITE
-        white_mobility = len(list(self.board.legal_moves))
-
-        # Count mobility for black
-        self.board.turn = chess.BLACK
-        black_mobility = len(list(self.board.legal_moves))
-
-        # Restore original turn
-        self.board.turn = original_turn
-
-        return (white_mobility - black_mobility) * 2
-
-    def evaluate_material_and_position(self) -> float:
+        """
+        Evaluates piece mobility: the squares each side's pieces (pawns and
+        kings excluded) attack that aren't occupied by their own pieces.
+        Attack masks are pseudo-legal, so the board is never modified and no
+        legal move generation is needed.
+        """
+        board = self.board
+        # A pawn's attacks are its captures, not where it can move, so pawns
+        # are left out along with the king
+        pieces = board.occupied & ~(board.pawns | board.kings)
+        mobility = [0, 0]
+        for color in chess.COLORS:
+            own = board.occupied_co[color]
+            for square in chess.scan_forward(own & pieces):
+                mobility[color] += popcount(board.attacks_mask(square) & ~own)
+
+        return (mobility[chess.WHITE] - mobility[chess.BLACK]) * 2
+
+    def evaluate_material_and_position(self, bitboards: Optional[PieceTable] = None,
+                                       endgame: Optional[bool] = None) -> int:
         """Original material and piece-square table evaluation"""
+        if endgame is None:
+            endgame = self.is_endgame()
+        if isinstance(self.board, EvaluatedBoard):
+            # Maintained incrementally by push()/pop()
+            return self.board.square_scores[endgame]
+        if bitboards is None:
+            bitboards = self.snapshot()[0]
+
+        # The king's table depends on the game phase; the other pieces' don't
+        tables = self.MATERIAL_SQUARE_TABLES_ENDGAME if endgame else self.MATERIAL_SQUARE_TABLES
+        return piece_square_score(bitboards, tables)
+
+    def evaluate_pawn_structure(self, bitboards: Optional[PieceTable] = None) -> int:
+        """Evaluates pawn structure including doubled, isolated, and passed pawns."""
         score = 0
+        if bitboards is None:
+            # Only the pawns are needed, straight from the raw bitboards
+            board = self.board
+            white_pawns = board.pawns & board.occupied_co[chess.WHITE]
+            black_pawns = board.pawns & board.occupied_co[chess.BLACK]
+        else:
+            white_pawns = bitboards[chess.WHITE][chess.PAWN]
+            black_pawns = bitboards[chess.BLACK][chess.PAWN]
+        if not white_pawns | black_pawns:
+            # Pawnless endgame: nothing to score
+            return 0
 
-        for square in chess.SQUARES:
-            piece = self.board.piece_at(square)
-            if piece is not None:
-                # Material score
-                value = self.PIECE_VALUES[piece.piece_type]
-                if piece.color == chess.WHITE:
-                    score += value
-                else:
-                    score -= value
+        # Doubled and isolated pawns
+        for pawns, sign in ((white_pawns, -1), (black_pawns, 1)):
+            if not pawns:
+                continue
+            # File fill: fold the eight ranks onto the first one, so bit f of
+            # `files` is set if there is a pawn on file f
+            files = pawns | (pawns >> 32)
+            files |= files >> 16
+            files = (files | (files >> 8)) & 0xFF
 
-                # Position score
-                position_score = self.get_piece_table_value(piece, square)
-                if piece.color == chess.WHITE:
-                    score += position_score
-                else:
-                    score -= position_score
+            # Doubled pawns: every pawn beyond the first on its file costs 20,
+            # i.e. 20 per pawn more than there are occupied files
+            score += sign * 20 * (popcount(pawns) - popcount(files))
 
-        return score
-    def evaluate_pawn_structure(self) -> int:
-        """Evaluates pawn structure including doubled, isolated, and passed pawns."""
-        score = 0
-        white_pawn_files = [0] * 8
-        black_pawn_files = [0] * 8
-
-        # Count pawns on each file
-        for square in chess.SQUARES:
-            piece = self.board.piece_at(square)
-            if piece and piece.piece_type == chess.PAWN:
-                file = chess.square_file(square)
-                if piece.color == chess.WHITE:
-                    white_pawn_files[file] += 1
-                else:
-                    black_pawn_files[file] += 1
-
-        # Evaluate doubled and isolated pawns
-        for file in range(8):
-            # Doubled pawns penalty
-            if white_pawn_files[file] > 1:
-                # penalize each extra pawn on that file
-                score -= 20 * (white_pawn_files[file] - 1)
-            if black_pawn_files[file] > 1:
-                score += 20 * (black_pawn_files[file] - 1)
-
-            # Isolated pawns penalty
-            if white_pawn_files[file] > 0:
-                # no neighbor pawns on adjacent files
-                left_empty = (file == 0 or white_pawn_files[file-1] == 0)
-                right_empty = (file == 7 or white_pawn_files[file+1] == 0)
-                if left_empty and right_empty:
-                    score -= 10
-            if black_pawn_files[file] > 0:
-                left_empty = (file == 0 or black_pawn_files[file-1] == 0)
-                right_empty = (file == 7 or black_pawn_files[file+1] == 0)
-                if left_empty and right_empty:
-                    score += 10
+            # Isolated pawns: files with pawns but no pawns on either neighbour file
+            isolated = files & ~((files << 1) | (files >> 1)) & 0xFF
+            score += sign * 10 * popcount(isolated)
 
         # (1) Big bonus for passed pawns (especially if advanced)
-        for square in chess.SQUARES:
-            piece = self.board.piece_at(square)
-            if piece and piece.piece_type == chess.PAWN:
-                if self.is_passed_pawn(square, piece.color):
-                    rank = chess.square_rank(square)
-                    if piece.color == chess.WHITE:
-                        # Example: base + advanced bonus
-                        # If rank=4 or 5, 6, 7 => bigger bonus for being closer to promotion
-                        # You can tune these numbers to taste
-                        passed_bonus = 200 + rank * 50
-                        score += passed_bonus
-                    else:
-                        # For Black, the rank is reversed
-                        # e.g. rank=3 => 8-3=5 from black's perspective
-                        # Or just do something symmetrical
-                        passed_bonus = 200 + (7 - rank) * 50
-                        score -= passed_bonus
+        # One AND against the precomputed front span per pawn
+        white_masks, black_masks = self.PASSED_PAWN_MASKS[chess.WHITE], self.PASSED_PAWN_MASKS[chess.BLACK]
+        white_bonus, black_bonus = self.PASSED_PAWN_BONUS[chess.WHITE], self.PASSED_PAWN_BONUS[chess.BLACK]
+        for square in chess.scan_forward(white_pawns):
+            if not black_pawns & white_masks[square]:
+                # Base + advanced bonus: bigger for being closer to promotion
+                score += white_bonus[square]
+        for square in chess.scan_forward(black_pawns):
+            if not white_pawns & black_masks[square]:
+                score -= black_bonus[square]
 
         return score
 
 
-    def count_pieces(self, color: bool) -> int:
+    def count_pieces(self, color: bool, counts: Optional[PieceTable] = None) -> int:
         """Count number of pieces (excluding pawns and king)"""
-        count = 0
-        for piece_type in [chess.QUEEN, chess.ROOK, chess.BISHOP, chess.KNIGHT]:
-            count += len(self.board.pieces(piece_type, color))
-        return count
+        if counts is None:
+            # Everything that isn't a pawn or a king, in a single popcount
+            board = self.board
+            return popcount(board.occupied_co[color] & ~(board.pawns | board.kings))
+        color_counts = counts[color]
+        return (color_counts[chess.QUEEN] + color_counts[chess.ROOK]
+                + color_counts[chess.BISHOP] + color_counts[chess.KNIGHT])
 
 
-    def evaluate_king_proximity(self, white_winning: bool) -> float:
+    def evaluate_king_proximity(self, white_winning: bool, bitboards: Optional[PieceTable] = None) -> int:
         """Evaluate king proximity in winning positions"""
         score = 0
-        white_king = self.board.king(chess.WHITE)
-        black_king = self.board.king(chess.BLACK)
+        if bitboards is None:
+            kings = self.board.kings
+            white_kings = kings & self.board.occupied_co[chess.WHITE]
+            black_kings = kings & self.board.occupied_co[chess.BLACK]
+        else:
+            white_kings = bitboards[chess.WHITE][chess.KING]
+            black_kings = bitboards[chess.BLACK][chess.KING]
 
-        if white_king and black_king:
-            distance = chess.square_distance(white_king, black_king)
+        if white_kings and black_kings:
+            distance = SQUARE_DISTANCE[(chess.msb(white_kings) << 6) | chess.msb(black_kings)]
             if white_winning:
                 score -= distance * 10  # White king should get closer
             else:
@@ -297,33 +427,35 @@ class Evaluation:
 
         return score
 
-    def evaluate_piece_centralization(self, white_winning: bool) -> float:
+    def evaluate_piece_centralization(self, white_winning: bool) -> int:
         """Evaluate piece centralization in winning positions"""
         score = 0
-        central_squares = [chess.E4, chess.D4, chess.E5, chess.D5]
+        board = self.board
+        # Knights, bishops, rooks and queens; only occupied squares are visited
+        pieces = board.occupied & ~(board.pawns | board.kings)
 
-        for square in chess.SQUARES:
-            piece = self.board.piece_at(square)
-            if piece and piece.piece_type != chess.KING and piece.piece_type != chess.PAWN:
-                # Calculate distance to center
-                min_distance = min(chess.square_distance(square, center) for center in central_squares)
-                piece_score = (4 - min_distance) * 5  # 5 points per square closer to center
+        for color in chess.COLORS:
+            for square in chess.scan_forward(pieces & board.occupied_co[color]):
+                piece_score = CENTRALIZATION[square]
 
-                if piece.color == chess.WHITE:
+                if color == chess.WHITE:
                     score += piece_score
                 else:
                     score -= piece_score
 
         return score if white_winning else -score
 
-    def evaluate_winning_position(self, white_winning: bool) -> float:
+    def evaluate_winning_position(self, white_winning: bool, bitboards: Optional[PieceTable] = None,
+                                  counts: Optional[PieceTable] = None) -> int:
         """
         Additional evaluation terms for winning positions
         """
         score = 0
+        if bitboards is None or counts is None:
+            bitboards, counts = self.snapshot()[:2]
 
         # 1. Encourage piece exchanges when ahead
-        piece_count_diff = self.count_pieces(chess.WHITE) - self.count_pieces(chess.BLACK)
+        piece_count_diff = self.count_pieces(chess.WHITE, counts) - self.count_pieces(chess.BLACK, counts)
         if white_winning:
             score -= piece_count_diff * 20  # White wants to trade when winning
         else:
@@ -331,40 +463,170 @@ class Evaluation:
 
 
         # 3. Evaluate king proximity in winning positions
-        score += self.evaluate_king_proximity(white_winning)
+        score += self.evaluate_king_proximity(white_winning, bitboards)
 
         # 4. Evaluate piece centralization
         score += self.evaluate_piece_centralization(white_winning)
 
         return score if white_winning else -score
 
-    def evaluate_material(self) -> float:
+    def evaluate_material(self, counts: Optional[PieceTable] = None) -> int:
         """Pure material evaluation"""
+        if counts is None:
+            # Twelve popcounts on the raw bitboards, without building a snapshot
+            board = self.board
+            white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+            values = self.PIECE_VALUES
+            return ((popcount(board.pawns & white) - popcount(board.pawns & black)) * values[chess.PAWN]
+                    + (popcount(board.knights & white) - popcount(board.knights & black)) * values[chess.KNIGHT]
+                    + (popcount(board.bishops & white) - popcount(board.bishops & black)) * values[chess.BISHOP]
+                    + (popcount(board.rooks & white) - popcount(board.rooks & black)) * values[chess.ROOK]
+                    + (popcount(board.queens & white) - popcount(board.queens & black)) * values[chess.QUEEN]
+                    + (popcount(board.kings & white) - popcount(board.kings & black)) * values[chess.KING])
         score = 0
         for piece_type in chess.PIECE_TYPES:
-            score += len(self.board.pieces(piece_type, chess.WHITE)) * self.PIECE_VALUES[piece_type]
-            score -= len(self.board.pieces(piece_type, chess.BLACK)) * self.PIECE_VALUES[piece_type]
+            score += counts[chess.WHITE][piece_type] * self.PIECE_VALUES[piece_type]
+            score -= counts[chess.BLACK][piece_type] * self.PIECE_VALUES[piece_type]
         return score
 
-    def evaluate(self) -> float:
+    def evaluate(self) -> int:
         """
         Main evaluation function.
         Returns score from White's perspective.
+        The score only depends on the position, so it is cached by Zobrist
+        key (which covers side to move, castling rights and en passant).
+        """
+        key = self.transposition_key()
+        slot = key & (self.EVAL_CACHE_SIZE - 1)
+        if self.eval_cache_keys[slot] == key:
+            return self.eval_cache_scores[slot]
+
+        score = self.evaluate_position()
+        self.eval_cache_keys[slot] = key
+        self.eval_cache_scores[slot] = score
+        return score
+
+    def evaluate_window(self, alpha: int, beta: int) -> int:
+        """
+        evaluate() for a search node with window [alpha, beta]. A cached full
+        evaluation is returned if there is one; otherwise, when the lazy
+        estimate is more than LAZY_EVAL_MARGIN outside the window, the
+        estimate is returned without running the remaining terms.
+
+        This is a heuristic cutoff: the remaining terms usually stay within
+        the margin, but are not guaranteed to, so on rare nodes the estimate
+        lands on the other side of the window from the full evaluation.
+        """
+        key = self.transposition_key()
+        slot = key & (self.EVAL_CACHE_SIZE - 1)
+        if self.eval_cache_keys[slot] == key:
+            return self.eval_cache_scores[slot]
+
+        lazy = self.evaluate_lazy()
+        if lazy + self.LAZY_EVAL_MARGIN < alpha or lazy - self.LAZY_EVAL_MARGIN > beta:
+            return lazy
+        return self.evaluate()
+
+    def evaluate_lazy(self) -> int:
         """
+        Cheap estimate of evaluate(): material, piece-square tables and pawn
+        structure, without mobility or the winning-position terms, and
+        without checkmate/stalemate detection. On an EvaluatedBoard the
+        material and piece-square part is two popcounts and a lookup of the
+        incrementally maintained score. Pawn structure is included because
+        passed pawns alone can be worth several hundred centipawns.
+        """
+        return (self.evaluate_material_and_position(endgame=self.is_endgame())
+                + self.evaluate_pawn_structure())
+
+    def evaluate_position(self) -> int:
+        """Evaluates the position from scratch, bypassing the cache."""
         if self.board.is_checkmate():
             return -self.CHECKMATE if self.board.turn else self.CHECKMATE
         if self.board.is_stalemate() or self.board.is_insufficient_material():
             return 0
 
+        # Bitboards, piece counts, material and game phase shared by all the
+        # terms below, all from a single pass over the piece bitboards
+        bitboards, counts, material_diff = self.snapshot()
+        endgame = self.is_endgame(counts)
+
         # Basic material and position evaluation
-        score = self.evaluate_material_and_position()
+        score = self.evaluate_material_and_position(bitboards, endgame)
         score += self.evaluate_mobility() * 5
-        score += self.evaluate_pawn_structure()
+        score += self.evaluate_pawn_structure(bitboards)
 
         # Additional evaluation for winning positions
-        material_diff = self.evaluate_material()
         if abs(material_diff) > 100:  # If someone is clearly winning
-            score += self.evaluate_winning_position(material_diff > 0)
+            score += self.evaluate_winning_position(material_diff > 0, bitboards, counts)
 
         return score
 
+
+class EvaluatedBoard(HashedBoard):
+    """
+    HashedBoard that also keeps the material + piece-square table score
+    (White minus Black) up to date incrementally.
+
+    Like the Zobrist key, push() only subtracts the contribution of the
+    squares the move touches before the move and adds it back after it, and
+    pop() restores the previous score from a stack. Two scores are kept,
+    indexed by the endgame flag, since the king's table depends on the phase.
+    They are rebuilt from scratch in the same places as the Zobrist key.
+    """
+
+    square_scores: Tuple[int, int]
+    _score_stack: List[Tuple[int, int]]
+
+    def clear_stack(self) -> None:
+        super().clear_stack()
+        self._score_stack = []
+        self.square_scores = self._squares_score(chess.BB_ALL)
+
+    def copy(self, *, stack: Union[bool, int] = True) -> "EvaluatedBoard":
+        board = super().copy(stack=stack)
+        board.square_scores = self.square_scores
+        if stack:
+            stack = len(self._score_stack) if stack is True else stack
+            board._score_stack = self._score_stack[-stack:]
+        return board
+
+    def apply_transform(self, f: Callable[[chess.Bitboard], chess.Bitboard]) -> None:
+        # clear_stack runs before python-chess finishes the transform
+        super().apply_transform(f)
+        self.square_scores = self._squares_score(chess.BB_ALL)
+
+    def apply_mirror(self) -> None:
+        # The colours are swapped after apply_transform
+        super().apply_mirror()
+        self.square_scores = self._squares_score(chess.BB_ALL)
+
+    def push(self, move: chess.Move) -> None:
+        self._score_stack.append(self.square_scores)
+        touched = self._touched_squares(move)
+        middlegame, endgame = self.square_scores
+        before = self._squares_score(touched)
+        super().push(move)
+        after = self._squares_score(touched)
+        self.square_scores = (middlegame - before[0] + after[0], endgame - before[1] + after[1])
+
+    def pop(self) -> chess.Move:
+        move = super().pop()
+        self.square_scores = self._score_stack.pop()
+        return move
+
+    def _squares_score(self, mask: chess.Bitboard) -> Tuple[int, int]:
+        """Middlegame and endgame material + position score of the pieces on `mask`."""
+        middlegame_tables = Evaluation.MATERIAL_SQUARE_TABLES
+        endgame_tables = Evaluation.MATERIAL_SQUARE_TABLES_ENDGAME
+        white = self.occupied_co[chess.WHITE]
+        middlegame = endgame = 0
+        for square in chess.scan_forward(mask & self.occupied):
+            piece_type = self.piece_type_at(square)
+            if white & chess.BB_SQUARES[square]:
+                middlegame += middlegame_tables[chess.WHITE][piece_type][square]
+                endgame += endgame_tables[chess.WHITE][piece_type][square]
+            else:
+                middlegame -= middlegame_tables[chess.BLACK][piece_type][square]
+                endgame -= endgame_tables[chess.BLACK][piece_type][square]
+        return middlegame, endgame
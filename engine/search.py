@@ -1,10 +1,10 @@
 import chess
-import chess.polyglot
 import time
 import random
-from engine.evaluate import Evaluation
+from engine.board import zobrist_key
+from engine.evaluate import EvaluatedBoard, Evaluation
 from enum import Enum
-from typing import Optional, Dict, List
+from typing import Optional, List, NamedTuple
 
 
 class SearchTimeout(Exception):
@@ -17,18 +17,17 @@ class NodeType(Enum):
     ALPHA = 1    # Upper bound
     BETA = 2     # Lower bound
 
-class TranspositionEntry:
+class TranspositionEntry(NamedTuple):
     """Entry in the transposition table"""
-    def __init__(self, key: int, depth: int, score: float, node_type: NodeType, best_move: Optional[chess.Move]):
-        self.key = key
-        self.depth = depth
-        self.score = score
-        self.node_type = node_type
-        self.best_move = best_move
+    key: int
+    depth: int
+    score: int
+    node_type: NodeType
+    best_move: Optional[chess.Move]
 
 class ChessEngine:
     """
-    Chess engine using minimax with alpha-beta pruning.
+    Chess engine using negamax with alpha-beta pruning and principal variation search.
     """
     def __init__(self, board: chess.Board, engine_color: chess.Color = chess.WHITE):
         self.board = board
@@ -37,27 +36,52 @@ class ChessEngine:
 
         # Typically a large value for mate detection, e.g. 1 million.
         self.MATE_SCORE = 1000000
+        # Integer window bound, beyond any score (including mates) the search returns
+        self.INFINITY = self.MATE_SCORE + 1
+        # MVV-LVA victim values, indexed by piece type
+        self.PIECE_VALUES = self.evaluator.PIECE_VALUES
 
         self.engine_color = engine_color
         self.best_move = None
+        # Deepest fully completed iteration of the last search
+        self.depth_reached = 0
 
-        # Initialize transposition table
-        self.tt_size = 1000000  # Size of transposition table
-        self.tt: Dict[int, TranspositionEntry] = {}
+        # Initialize transposition table. It lives as long as the engine, so
+        # entries from earlier moves of the game are reused by later searches.
+        # Fixed-size and direct-mapped: an entry lives in slot key & (size - 1)
+        # and is overwritten by the next position mapping to the same slot.
+        self.tt_size = 1 << 20  # Size of transposition table (a power of two)
+        self.tt: List[Optional[TranspositionEntry]] = [None] * self.tt_size
+
+        # Depth reduction of the null-move search, and the minimum depth it's tried at
+        # (one more ply per 6 plies of remaining depth)
+        self.NULL_MOVE_REDUCTION = 2
+        self.NULL_MOVE_MIN_DEPTH = 3
+
+        # Reverse futility pruning: deepest depth it's tried at, and the margin per ply
+        self.REVERSE_FUTILITY_MAX_DEPTH = 6
+        self.REVERSE_FUTILITY_MARGIN = 100
 
         # Initialize killer moves
         self.max_depth = 100  # Maximum search depth
         self.killer_moves: List[List[Optional[chess.Move]]] = [[None, None] for _ in range(self.max_depth)]
 
-    def get_ordered_moves(self, tt_move: Optional[chess.Move] = None, depth: int = 0) -> list:
-        """Enhanced move ordering with winning position consideration"""
+    def get_ordered_moves(self, tt_move: Optional[chess.Move] = None, depth: int = 0,
+                          legal_moves: Optional[List[chess.Move]] = None) -> list:
+        """
+        Enhanced move ordering with winning position consideration. Pass the
+        legal moves in if the caller already generated them.
+        """
         #print("Getting ordered moves...")
         moves = []
         material_eval = self.evaluator.evaluate_material()
         is_winning = abs(material_eval) > 200
         is_winning_side = (material_eval > 0) == (self.board.turn == chess.WHITE)
 
-        for move in self.board.legal_moves:
+        if legal_moves is None:
+            legal_moves = list(self.board.generate_legal_moves())
+
+        for move in legal_moves:
             score = 0
 
             # Transposition table best move gets top priority
@@ -83,32 +107,47 @@ class ChessEngine:
     def store_killer_move(self, move: chess.Move, depth: int):
         """Store a killer move at the given depth"""
         #print("Killer move", move)
-        self.killer_moves[depth].append(move)
         if depth >= self.max_depth:
             return
         if move != self.killer_moves[depth][0]:
             self.killer_moves[depth][1] = self.killer_moves[depth][0]
             self.killer_moves[depth][0] = move
 
-    def store_tt_entry(self, key: int, depth: int, score: float, node_type: NodeType, best_move: Optional[chess.Move]):
+    def probe_tt(self, key: int) -> Optional[TranspositionEntry]:
+        """Look up a position in the transposition table"""
+        entry = self.tt[key & (self.tt_size - 1)]
+        if entry is not None and entry.key == key:
+            return entry
+        return None
+
+    def store_tt_entry(self, key: int, depth: int, score: int, node_type: NodeType, best_move: Optional[chess.Move]):
         """Store an entry in the transposition table"""
         #print("Storing tt entry", key, depth, score, node_type, best_move)
-        if len(self.tt) >= self.tt_size:
-            self.tt.clear()  # Simple approach: clear the TT when full
-        self.tt[key] = TranspositionEntry(key, depth, score, node_type, best_move)
+        self.tt[key & (self.tt_size - 1)] = TranspositionEntry(key, depth, score, node_type, best_move)
+
+    def capture_score(self, move: chess.Move) -> int:
+        """
+        MVV-LVA score of a capture: most valuable victim first, and among
+        equal victims the least valuable attacker first. Piece values are
+        at least 10 apart, so the attacker's piece type only breaks ties.
+        """
+        if self.board.is_en_passant(move):
+            victim_type = chess.PAWN
+        else:
+            victim_type = self.board.piece_type_at(move.to_square)
+        attacker_type = self.board.piece_type_at(move.from_square)
+        if victim_type and attacker_type:
+            return 10000 + self.PIECE_VALUES[victim_type] - attacker_type
+        return 0
 
     def score_move(self, move: chess.Move, is_winning_position: bool = False) -> int:
         """Enhanced move scoring considering winning positions"""
         score = 0
         #print("Calculating score...")
+        is_capture = self.board.is_capture(move)
         # Bonus for captures
-        if self.board.is_capture(move):
-            victim = self.board.piece_at(move.to_square)
-            attacker = self.board.piece_at(move.from_square)
-            if victim and attacker:
-                victim_value = self.evaluator.PIECE_VALUES[victim.piece_type]
-                attacker_value = self.evaluator.PIECE_VALUES[attacker.piece_type]
-                score += 10000 + victim_value - (attacker_value // 10)
+        if is_capture:
+            score += self.capture_score(move)
 
         # Bonus for giving check
         if self.board.gives_check(move):
@@ -120,73 +159,77 @@ class ChessEngine:
 
         # If we’re in a winning position, encourage simplifications and pawn pushes
         if is_winning_position:
-            if self.board.is_capture(move):
+            if is_capture:
                 score += 5000  # encourage trades when ahead
 
             # Encourage advancing pawns if winning
-            attacker_piece = self.board.piece_at(move.from_square)
-            if attacker_piece and attacker_piece.piece_type == chess.PAWN:
-                rank = chess.square_rank(move.to_square)
-                if self.board.turn == chess.WHITE:
-                    score += rank * 100
-                else:
-                    score += (7 - rank) * 100
+            if self.board.piece_type_at(move.from_square) == chess.PAWN:
+                # Rank from the mover's side: square ^ 56 flips it for Black
+                to_square = move.to_square if self.board.turn == chess.WHITE else move.to_square ^ 56
+                score += (to_square >> 3) * 100
 
         return score
 
-    def quiescence(self, alpha: float, beta: float, is_maximizing: bool, depth: int = 0, max_depth: int = 4) -> float:
-        """Quiescence search with winning position consideration"""
+    def quiescence(self, alpha: int, beta: int, start_time: float, time_limit: float,
+                   depth: int = 0, max_depth: int = 4) -> int:
+        """Quiescence search, scored from the side to move's point of view"""
         #print("Running Quiescence...")
         self.nodes_searched += 1
 
-        stand_pat = self.evaluator.evaluate()
+        # Check for timeout: capture chains can outlast the main search's budget
+        if (time.time() - start_time) > time_limit:
+            raise SearchTimeout
 
-        # If we hit quiescence depth, just return the static eval
-        if depth >= max_depth:
-            return stand_pat
+        if self.board.is_check() and depth < max_depth:
+            # A check can't be answered by standing pat: every evasion is
+            # searched, and having none is checkmate
+            moves = sorted(self.board.generate_legal_moves(), key=self.capture_score, reverse=True)
+            if not moves:
+                return -self.MATE_SCORE
+        else:
+            # Lazy evaluation: far outside the window, the cheap estimate stands in
+            # for the full eval (a heuristic, see Evaluation.evaluate_window). The
+            # evaluator scores from White's side, so flip the window for Black.
+            if self.board.turn == chess.WHITE:
+                stand_pat = self.evaluator.evaluate_window(alpha, beta)
+            else:
+                stand_pat = -self.evaluator.evaluate_window(-beta, -alpha)
 
-        if is_maximizing:
-            if stand_pat < beta:
-                beta = stand_pat
-            # Only search captures/checks
-            for move in self.get_ordered_moves():
-                if not (self.board.is_capture(move) or self.board.gives_check(move)):
-                    continue
+            # If we hit quiescence depth, just return the static eval
+            if depth >= max_depth:
+                return stand_pat
 
-                self.board.push(move)
-                score = self.quiescence(alpha, beta, False, depth + 1, max_depth)
-                self.board.pop()
+            # The side to move can always "stand pat" on the static eval instead of capturing
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
 
-                if score < beta:
-                    beta = score
-                if alpha >= beta:
-                    break
-            return beta
-        else:
-            if stand_pat > alpha:
-                alpha = stand_pat
-            for move in self.get_ordered_moves():
-                if not (self.board.is_capture(move) or self.board.gives_check(move)):
-                    continue
-
-                self.board.push(move)
-                score = self.quiescence(alpha, beta, True, depth + 1, max_depth)
-                self.board.pop()
+            # Only captures are searched, best MVV-LVA first. Ordering them by
+            # capture_score alone skips score_move's gives_check test, which
+            # pushes and pops every capture just to rank it.
+            moves = sorted(self.board.generate_legal_captures(), key=self.capture_score, reverse=True)
 
-                if score > alpha:
-                    alpha = score
-                if alpha >= beta:
-                    break
-            return alpha
+        for move in moves:
+            self.board.push(move)
+            score = -self.quiescence(-beta, -alpha, start_time, time_limit, depth + 1, max_depth)
+            self.board.pop()
+
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
 
-    def minimax(self, depth: int, alpha: float, beta: float, is_maximizing: bool,
-                start_time: float, time_limit: float, is_root: bool = False) -> float:
+    def negamax(self, depth: int, alpha: int, beta: int, start_time: float, time_limit: float,
+                is_root: bool = False, allow_null: bool = True) -> int:
         """
-        Minimax with alpha-beta, plus:
+        Negamax with alpha-beta and principal variation search. Scores are
+        from the side to move's point of view, plus:
           (1) Mate distance scoring
           (2) Discouraging draws if we’re winning
+          (3) Null-move pruning (not twice in a row: see allow_null)
+          (4) Reverse futility pruning
         """
-        #print("Running minimax...")
+        #print("Running negamax...")
         self.nodes_searched += 1
 
         # Check for timeout
@@ -201,35 +244,48 @@ class ChessEngine:
             beta = self.MATE_SCORE - depth
         if alpha >= beta:
             return alpha
+        original_alpha = alpha
 
         # Transposition Table
-        position_key = chess.polyglot.zobrist_hash(self.board)
-        tt_entry = self.tt.get(position_key)
+        position_key = zobrist_key(self.board)
+        tt_entry = self.probe_tt(position_key)
         tt_move = None
 
-        if tt_entry and tt_entry.depth >= depth:
-            if tt_entry.node_type == NodeType.EXACT:
-                if is_root:
-                    self.best_move = tt_entry.best_move
-                return tt_entry.score
-            elif tt_entry.node_type == NodeType.ALPHA and tt_entry.score <= alpha:
-                return alpha
-            elif tt_entry.node_type == NodeType.BETA and tt_entry.score >= beta:
-                return beta
+        if tt_entry:
+            if tt_entry.depth >= depth:
+                if tt_entry.node_type == NodeType.EXACT:
+                    if is_root:
+                        self.best_move = tt_entry.best_move
+                    return tt_entry.score
+                elif tt_entry.node_type == NodeType.ALPHA and tt_entry.score <= alpha:
+                    return alpha
+                elif tt_entry.node_type == NodeType.BETA and tt_entry.score >= beta:
+                    return beta
+            # Entries from shallower iterations can't cut off, but their best
+            # move is still the best first guess for move ordering
             tt_move = tt_entry.best_move
 
+        # Legal moves are generated once here and reused for move ordering.
+        # At the horizon only the checkmate and stalemate tests need them,
+        # so probing for a single move is enough there.
+        if depth > 0:
+            legal_moves = list(self.board.generate_legal_moves())
+            has_legal_moves = bool(legal_moves)
+        else:
+            legal_moves = None
+            has_legal_moves = any(self.board.generate_legal_moves())
+
         # --- Checkmate Check ---
-        if self.board.is_checkmate():
+        if not has_legal_moves and self.board.is_check():
             # (1) Mate distance scoring: prefer mate in fewer moves
-            # If is_maximizing==True, we were about to move => we got checkmated => negative
-            return -self.MATE_SCORE + depth if is_maximizing else self.MATE_SCORE - depth
+            return -self.MATE_SCORE + depth
 
         # --- Draw Check ---
-        if self.board.is_stalemate() or self.board.is_insufficient_material():
+        if not has_legal_moves or self.board.is_insufficient_material():
             # (2) Discourage draws if we have a winning edge
             material_eval = self.evaluator.evaluate_material()
             # If the current side to move has a positive advantage, that side is "winning_side"
-            is_winning_side = (material_eval > 0) == (self.board.turn == chess.WHITE)
+            is_winning_side = material_eval != 0 and (material_eval > 0) == (self.board.turn == chess.WHITE)
 
             if is_winning_side:
                 # Slight penalty if you're winning but forced to draw
@@ -240,68 +296,76 @@ class ChessEngine:
 
         # --- Depth Check => Quiescence ---
         if depth == 0:
-            return self.quiescence(alpha, beta, is_maximizing)
+            return self.quiescence(alpha, beta, start_time, time_limit)
+
+        in_check = self.board.is_check()
+
+        # (4) Reverse futility pruning: near the horizon, if the static eval
+        # beats beta by a margin per remaining ply, assume no move drops it
+        # below beta. Uses the full (cached) eval, not the lazy estimate.
+        if (not is_root and not in_check and depth <= self.REVERSE_FUTILITY_MAX_DEPTH
+                and abs(beta) < self.MATE_SCORE - self.max_depth):
+            margin_beta = beta + self.REVERSE_FUTILITY_MARGIN * depth
+            static_eval = self.evaluator.evaluate()
+            if self.board.turn == chess.BLACK:
+                static_eval = -static_eval
+            if static_eval >= margin_beta:
+                return static_eval - self.REVERSE_FUTILITY_MARGIN * depth
+
+        # (3) Null-move pruning: let the side to move pass. If a reduced search
+        # still fails high, a real move would too. Skipped in check, and
+        # without pieces other than pawns and king, where passing may be
+        # better than any move (zugzwang).
+        if (allow_null and not is_root and depth >= self.NULL_MOVE_MIN_DEPTH
+                and not in_check
+                and self.board.occupied_co[self.board.turn] & ~(self.board.pawns | self.board.kings)):
+            reduction = self.NULL_MOVE_REDUCTION + depth // 6
+            self.board.push(chess.Move.null())
+            score = -self.negamax(max(depth - 1 - reduction, 0), -beta, -beta + 1,
+                                  start_time, time_limit, allow_null=False)
+            self.board.pop()
+            if score >= beta:
+                return beta
 
-        ordered_moves = self.get_ordered_moves(tt_move, depth)
+        ordered_moves = self.get_ordered_moves(tt_move, depth, legal_moves)
         best_move = None
+        best_score = -self.MATE_SCORE
 
-        if is_maximizing:
-            max_score = -self.MATE_SCORE
-            for move in ordered_moves:
-                self.board.push(move)
-                score = self.minimax(depth - 1, alpha, beta,
-                                     False, start_time, time_limit)
-                self.board.pop()
-
-                if score > max_score:
-                    max_score = score
-                    best_move = move
-                    if is_root:
-                        self.best_move = move
-
-                alpha = max(alpha, score)
-                if alpha >= beta:
-                    self.store_killer_move(move, depth)
-                    break
-
-            # Store result in TT
-            node_type = NodeType.EXACT
-            if max_score <= alpha:
-                node_type = NodeType.ALPHA
-            elif max_score >= beta:
-                node_type = NodeType.BETA
-            self.store_tt_entry(position_key, depth, max_score, node_type, best_move)
-
-            return max_score
-
-        else:
-            min_score = self.MATE_SCORE
-            for move in ordered_moves:
-                self.board.push(move)
-                score = self.minimax(depth - 1, alpha, beta,
-                                     True, start_time, time_limit)
-                self.board.pop()
+        for i, move in enumerate(ordered_moves):
+            self.board.push(move)
+            if i == 0:
+                score = -self.negamax(depth - 1, -beta, -alpha, start_time, time_limit)
+            else:
+                # PVS: the first move is expected to be best, so the others
+                # only get a zero-window search proving they're no better,
+                # and a full re-search if that proof fails
+                score = -self.negamax(depth - 1, -alpha - 1, -alpha, start_time, time_limit)
+                if alpha < score < beta:
+                    score = -self.negamax(depth - 1, -beta, -score, start_time, time_limit)
+            self.board.pop()
 
-                if score < min_score:
-                    min_score = score
-                    best_move = move
-                    if is_root:
-                        self.best_move = move
+            if score > best_score:
+                best_score = score
+                best_move = move
+                if is_root:
+                    self.best_move = move
 
-                beta = min(beta, score)
-                if alpha >= beta:
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                # Captures are already ordered first; killers are for quiet moves
+                if not self.board.is_capture(move):
                     self.store_killer_move(move, depth)
-                    break
+                break
 
-            # Store result in TT
-            node_type = NodeType.EXACT
-            if min_score <= alpha:
-                node_type = NodeType.ALPHA
-            elif min_score >= beta:
-                node_type = NodeType.BETA
-            self.store_tt_entry(position_key, depth, min_score, node_type, best_move)
+        # Store result in TT, bounded against the window the node was searched with
+        node_type = NodeType.EXACT
+        if best_score <= original_alpha:
+            node_type = NodeType.ALPHA
+        elif best_score >= beta:
+            node_type = NodeType.BETA
+        self.store_tt_entry(position_key, depth, best_score, node_type, best_move)
 
-            return min_score
+        return best_score
 
     def find_best_move_iterative_deepening(self, max_depth: int, time_limit: float) -> Optional[chess.Move]:
         """
@@ -312,8 +376,11 @@ class ChessEngine:
         """
         #print("Finding best move wit iterative deepening...")
         self.nodes_searched = 0
+        self.depth_reached = 0
         self.best_move = None
         start_time = time.time()
+        # A timeout unwinds the recursion without its pops, so remember where the game is
+        root_ply = len(self.board.move_stack)
 
         # Clear killer moves for a new search
         self.killer_moves = [[None, None] for _ in range(self.max_depth)]
@@ -325,27 +392,28 @@ class ChessEngine:
 
         try:
             for depth in range(1, max_depth + 1):
-                is_maximizing = (self.board.turn == chess.WHITE)
-
                 # Use previous best move for better move ordering
                 if previous_best_move:
-                    position_key = chess.polyglot.zobrist_hash(self.board)
+                    position_key = zobrist_key(self.board)
                     self.store_tt_entry(position_key, depth - 1, 0, NodeType.EXACT, previous_best_move)
 
-                score = self.minimax(
+                score = self.negamax(
                     depth=depth,
-                    alpha=-float('inf'),
-                    beta=float('inf'),
-                    is_maximizing=is_maximizing,
+                    alpha=-self.INFINITY,
+                    beta=self.INFINITY,
                     start_time=start_time,
                     time_limit=time_limit,
                     is_root=True
                 )
+                # Report from White's point of view, like the evaluator
+                if self.board.turn == chess.BLACK:
+                    score = -score
 
                 elapsed = time.time() - start_time
                 print(f"[Depth {depth}] Score: {score}, Best Move: {self.best_move}, "
                       f"Nodes: {self.nodes_searched}, Time: {elapsed:.2f}s")
 
+                self.depth_reached = depth
                 previous_best_move = self.best_move
                 previous_scores.append(score)
 
@@ -384,11 +452,13 @@ class ChessEngine:
 
         except SearchTimeout:
             print(f"Search stopped due to timeout.")
+            while len(self.board.move_stack) > root_ply:
+                self.board.pop()
 
         # If no move found, try to retrieve from TT or do a quick fallback
         if self.best_move is None:
-            position_key = chess.polyglot.zobrist_hash(self.board)
-            tt_entry = self.tt.get(position_key)
+            position_key = zobrist_key(self.board)
+            tt_entry = self.probe_tt(position_key)
             if tt_entry and tt_entry.best_move:
                 self.best_move = tt_entry.best_move
             else:
@@ -410,7 +480,7 @@ class ChessEngine:
     def get_best_move_from_quick_search(self) -> Optional[chess.Move]:
         """Quick fallback 1-ply search"""
         #print("Quick fallback 1-ply search")
-        best_score = -float('inf') if self.board.turn == chess.WHITE else float('inf')
+        best_score = -self.INFINITY if self.board.turn == chess.WHITE else self.INFINITY
         best_move = None
 
         for move in self.get_ordered_moves():
@@ -428,13 +498,11 @@ class ChessEngine:
                     best_move = move
 
         # If somehow we still don't have anything, return any legal move
-        return best_move or (list(self.board.legal_moves)[0] if self.board.legal_moves else None)
+        return best_move or next(iter(self.board.legal_moves), None)
 
     def find_best_move(self, max_depth: int, time_limit: float = 60.0) -> Optional[chess.Move]:
         """Public method to find the best move using iterative deepening."""
         #print("Searching for best move...find_best_move")
-        start_time = time.time()
-        best_score = -float('inf')
         return self.find_best_move_iterative_deepening(max_depth, time_limit)
 
 
@@ -442,7 +510,7 @@ class ChessEngine:
 if __name__ == "__main__":
     # Test position with a tactical sequence
     fen = "r2r2k1/p1p3pp/1p2b3/4Pp2/5P2/q1P1B1P1/PQ6/RR4K1 b - - 0 1"
-    board = chess.Board(fen)
+    board = EvaluatedBoard(fen)
 
     print("Initial position:")
     print(board)
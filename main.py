@@ -1,10 +1,10 @@
-from engine.evaluate import Evaluation
+from engine.evaluate import EvaluatedBoard, Evaluation
 from engine.search import ChessEngine
 import chess
 from typing import List, Tuple
 import time
 
-def evaluate_moves(board: chess.Board, evaluator: Evaluation) -> List[Tuple[chess.Move, float]]:
+def evaluate_moves(board: chess.Board, evaluator: Evaluation) -> List[Tuple[chess.Move, int]]:
     """
     Evaluate all legal moves and return them sorted by evaluation.
     """
@@ -31,7 +31,7 @@ def evaluate_moves(board: chess.Board, evaluator: Evaluation) -> List[Tuple[ches
 def main():
     position = "8/8/1K1k4/8/8/P7/8/8 w - - 0 1"
 
-    board = chess.Board(fen=position)
+    board = EvaluatedBoard(fen=position)
     evaluator = Evaluation(board)
     engine = ChessEngine(board)
     print("Board Position:")
@@ -0,0 +1,100 @@
+import random
+from typing import Type
+
+import chess
+from engine.board import HashedBoard
+
+# Start positions with castling, en passant and promotions close at hand
+WALK_FENS = (
+    chess.STARTING_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+    "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1",
+    "r3k2r/1P6/8/2pP4/8/8/6p1/R3K2R w KQkq c6 0 1",
+)
+
+# Castling on each side, en passant and promotion captures
+SPECIAL_MOVES = (
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "e1g1"),
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 0 1", "e1c1"),
+    ("r3k2r/8/8/8/8/8/8/R3K2R b KQkq - 0 1", "e8c8"),
+    ("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3", "e5f6"),
+    ("n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1", "g2h1q"),
+    ("n1n5/PPPk4/8/8/8/8/4Kppp/5N1N w - - 0 1", "b7a8n"),
+)
+
+# Castling rights and an en passant square to transform, and lopsided
+# material so that swapping the colours changes the score
+TRANSFORM_FENS = (
+    "r1bqk1nr/pppp1ppp/2n5/2b1p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    WALK_FENS[2],
+    "8/8/8/8/8/8/8/K5qk w - - 0 1",
+)
+
+
+class IncrementalBoardTests:
+    """
+    Walks shared by the tests of the incrementally updated boards. A test
+    case mixes this in, sets board_class and implements assert_board(),
+    which is checked after every ply.
+    """
+
+    board_class: Type[HashedBoard] = HashedBoard
+
+    def assert_board(self, board: HashedBoard) -> None:
+        raise NotImplementedError
+
+    def test_random_walks(self):
+        rng = random.Random(20250101)
+        for fen in WALK_FENS:
+            for _ in range(20):
+                board = self.board_class(fen)
+                self.assert_board(board)
+                for _ in range(60):
+                    roll = rng.random()
+                    if roll < 0.15 and board.move_stack:
+                        board.pop()
+                    elif roll < 0.2:
+                        board = board.copy(stack=rng.choice((True, False, 1)))
+                    elif roll < 0.25 and not board.is_check():
+                        board.push(chess.Move.null())
+                    else:
+                        moves = list(board.legal_moves)
+                        if not moves:
+                            break
+                        board.push(rng.choice(moves))
+                    self.assert_board(board)
+
+                # Unwinding the whole walk gets back to the start position
+                while board.move_stack:
+                    board.pop()
+                    self.assert_board(board)
+
+    def test_special_moves(self):
+        for fen, uci in SPECIAL_MOVES:
+            with self.subTest(fen=fen, move=uci):
+                board = self.board_class(fen)
+                board.push_uci(uci)
+                self.assert_board(board)
+                board.pop()
+                self.assert_board(board)
+
+    def test_setters_rebuild_the_board(self):
+        board = self.board_class()
+        board.push_uci("e2e4")
+        board.set_fen(WALK_FENS[1])
+        self.assert_board(board)
+        board.remove_piece_at(chess.E1)
+        self.assert_board(board)
+
+        # Transforms move castling rights and the en passant square, and
+        # mirroring swaps colours and turn, after python-chess clears the stack
+        for fen in TRANSFORM_FENS:
+            with self.subTest(fen=fen):
+                board = self.board_class(fen)
+                self.assert_board(board.mirror())
+                self.assert_board(board.transform(chess.flip_horizontal))
+                board.apply_mirror()
+                self.assert_board(board)
+                board.apply_transform(chess.flip_anti_diagonal)
+                self.assert_board(board)
@@ -0,0 +1,18 @@
+import unittest
+
+import chess.polyglot
+from engine.board import HashedBoard
+from tests.incremental import IncrementalBoardTests
+
+
+class HashedBoardTest(IncrementalBoardTests, unittest.TestCase):
+    """The incremental Zobrist key always equals a full Polyglot hash."""
+
+    board_class = HashedBoard
+
+    def assert_board(self, board: HashedBoard):
+        self.assertEqual(board.zobrist_key, chess.polyglot.zobrist_hash(board), board.fen())
+
+
+if __name__ == "__main__":
+    unittest.main()
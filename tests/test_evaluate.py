@@ -0,0 +1,31 @@
+import unittest
+
+import chess.polyglot
+from engine.evaluate import EvaluatedBoard, Evaluation, piece_square_score
+from tests.incremental import IncrementalBoardTests
+
+
+class EvaluatedBoardTest(IncrementalBoardTests, unittest.TestCase):
+    """
+    The incremental material + piece-square scores always equal a full
+    rescan, and the inherited Zobrist key a full hash.
+    """
+
+    board_class = EvaluatedBoard
+
+    @classmethod
+    def setUpClass(cls):
+        # One evaluator, pointed at whichever board is checked
+        cls.evaluator = Evaluation(EvaluatedBoard())
+
+    def assert_board(self, board: EvaluatedBoard):
+        self.evaluator.board = board
+        bitboards = self.evaluator.snapshot()[0]
+        rescan = (piece_square_score(bitboards, Evaluation.MATERIAL_SQUARE_TABLES),
+                  piece_square_score(bitboards, Evaluation.MATERIAL_SQUARE_TABLES_ENDGAME))
+        self.assertEqual(board.square_scores, rescan, board.fen())
+        self.assertEqual(board.zobrist_key, chess.polyglot.zobrist_hash(board), board.fen())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import time
+import unittest
+
+import chess
+from engine.evaluate import EvaluatedBoard
+from engine.search import ChessEngine, SearchTimeout
+
+
+def draw_score(fen: str) -> int:
+    """Score negamax gives a drawn position, from the side to move's point of view."""
+    engine = ChessEngine(EvaluatedBoard(fen))
+    return engine.negamax(1, -engine.INFINITY, engine.INFINITY, time.time(), 60.0)
+
+
+class DrawScoreTest(unittest.TestCase):
+    """Draw contempt only applies to the side that is ahead in material."""
+
+    def test_stalemate_at_equal_material(self):
+        # Pawn each, the side to move is stalemated
+        self.assertEqual(draw_score("k7/Pp6/1K6/8/8/8/8/8 b - - 0 1"), 0)
+        self.assertEqual(draw_score("8/8/8/8/8/1k6/pP6/K7 w - - 0 1"), 0)
+
+    def test_insufficient_material_at_equal_material(self):
+        for fen in ("8/8/4k3/8/8/3K4/8/8 w - - 0 1",
+                    "8/8/4k3/8/8/3K4/8/8 b - - 0 1",
+                    "8/8/2b1k3/8/8/3K1B2/8/8 w - - 0 1",
+                    "8/8/2b1k3/8/8/3K1B2/8/8 b - - 0 1"):
+            with self.subTest(fen=fen):
+                self.assertEqual(draw_score(fen), 0)
+
+    def test_insufficient_material_when_ahead(self):
+        # King and bishop against king: only White is ahead
+        self.assertEqual(draw_score("8/8/4k3/8/8/3K1B2/8/8 w - - 0 1"), -500)
+        self.assertEqual(draw_score("8/8/4k3/8/8/3K1B2/8/8 b - - 0 1"), 0)
+
+
+class QuiescenceTest(unittest.TestCase):
+    """Quiescence searches evasions in check and honours the time limit."""
+
+    def test_check_is_not_stood_pat(self):
+        # The knight checks and forks the queen: every evasion loses it, so
+        # the score must fall well below White's static eval
+        engine = ChessEngine(EvaluatedBoard("8/RR6/8/7k/8/3n4/1Q6/4K3 w - - 0 1"))
+        score = engine.quiescence(-engine.INFINITY, engine.INFINITY, time.time(), 60.0)
+        self.assertLess(score, engine.evaluator.evaluate() - 500)
+
+    def test_checkmate(self):
+        # Back-rank mate: no evasions at all
+        engine = ChessEngine(EvaluatedBoard("R5k1/5ppp/8/8/8/8/5PPP/6K1 b - - 0 1"))
+        score = engine.quiescence(-engine.INFINITY, engine.INFINITY, time.time(), 60.0)
+        self.assertEqual(score, -engine.MATE_SCORE)
+
+    def test_times_out(self):
+        engine = ChessEngine(EvaluatedBoard("r1bqkbnr/pppp1ppp/2n5/4p3/3PP3/5N2/PPP2PPP/RNBQKB1R b KQkq - 0 3"))
+        with self.assertRaises(SearchTimeout):
+            engine.quiescence(-engine.INFINITY, engine.INFINITY, time.time(), -1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()